@@ -1,14 +1,26 @@
 import json
 import os
 
+try:
+    import orjson
+except ImportError:  # optional; the stdlib json module is the fallback
+    orjson = None
+
 CONFIG_FILE = ".pyvcs_config.json"
 
 def load_config():
     if os.path.exists(CONFIG_FILE):
+        if orjson:
+            with open(CONFIG_FILE, "rb") as f:
+                return orjson.loads(f.read())
         with open(CONFIG_FILE, "r") as f:
             return json.load(f)
     return {}
 
 def save_config(cfg):
+    if orjson:
+        with open(CONFIG_FILE, "wb") as f:
+            f.write(orjson.dumps(cfg, option=orjson.OPT_INDENT_2))
+        return
     with open(CONFIG_FILE, "w") as f:
         json.dump(cfg, f, indent=2)
@@ -1,3 +1,4 @@
+import logging
 import sys
 from pathlib import Path
 from PySide6 import QtWidgets
@@ -10,8 +11,14 @@ def main():
     parser = argparse.ArgumentParser(description='pyvcs GUI')
     parser.add_argument('--init', help='Initialize repository at target path (absolute or relative)')
     parser.add_argument('--path', help='Path to repository (defaults to current dir)')
+    parser.add_argument('--migrate-manifests', action='store_true',
+                        help='Convert JSON manifests to msgpack (requires msgpack)')
+    parser.add_argument('--verbose', action='store_true', help='Log debug output to stderr')
     args = parser.parse_args()
 
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.WARNING,
+                        format='%(asctime)s %(name)s %(levelname)s: %(message)s')
+
     target = Path(args.path) if args.path else Path('.')
 
     if args.init:
@@ -29,6 +36,13 @@ def main():
     if not repo.exists():
         print('No repository found. Run with --init <path> first.')
         return
+    if args.migrate_manifests:
+        try:
+            n = repo.migrate_manifests()
+        except RuntimeError as e:
+            print(e)
+            return
+        print('Migrated', n, 'manifests to msgpack')
 
     app = QtWidgets.QApplication(sys.argv)
     w = MainWindow(repo)
@@ -1,14 +1,108 @@
 from PySide6 import QtCore, QtGui, QtWidgets
 from pathlib import Path
 from .vcs import Repo
+from .utils import blake3, content_hash
 import difflib
 import json
 import csv
 import os
 import base64
+from html import escape
+import logging
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+log = logging.getLogger('pyvcs.ui')
+
+try:
+    # cdifflib ships a C SequenceMatcher; difflib.unified_diff looks the class
+    # up at call time, so swapping it in accelerates every diff below.
+    from cdifflib import CSequenceMatcher
+    difflib.SequenceMatcher = CSequenceMatcher
+except ImportError:
+    pass
+
+
+def _classify(files_a, files_b, differs):
+    """Split two manifests' file maps into (added, removed, modified, unchanged_count) in one pass."""
+    added, removed, modified = [], [], []
+    unchanged = 0
+    for k, info in files_a.items():
+        other = files_b.get(k)
+        if other is None:
+            removed.append(k)
+        elif differs(info, other):
+            modified.append(k)
+        else:
+            unchanged += 1
+    for k in files_b.keys():
+        if k not in files_a:
+            added.append(k)
+    return added, removed, modified, unchanged
+
+
+# Per-line styling for the single-file diff view, keyed on the line's first char
+_DIFF_LINE_STYLES = {'+': ' style="background:#ddffdd"', '-': ' style="background:#ffdddd"', '@': ' style="color:#666"'}
+
+
+# Repos the blob caches may read from, keyed by root so the caches never keep one alive.
+# Blobs are content-addressed and immutable, so entries in these caches never go stale.
+_repos = weakref.WeakValueDictionary()
+
+
+@lru_cache(maxsize=256)
+def _decoded_lines(repo_key, h):
+    """(lines, is_text) for a blob; an empty hash stands for a missing file."""
+    if not h:
+        return (), True
+    try:
+        return tuple(_repos[repo_key].read_blob(h).decode('utf-8').splitlines()), True
+    except UnicodeDecodeError:
+        return (), False
+
+
+@lru_cache(maxsize=4096)
+def _rehashed(repo_key, h, algo):
+    """Hash of blob h under algo, for comparing manifests written with different hash algorithms."""
+    return content_hash(_repos[repo_key].read_blob(h), algo)
+
+
+def _differs_fn(repo_key, ma, mb):
+    """differs(info_a, info_b) for files of manifests ma and mb.
+
+    Hashes only compare directly when both manifests used the same hash_algo
+    (manifests without one used SHA1); otherwise A's blob is rehashed with B's.
+    """
+    algo_a, algo_b = ma.get('hash_algo', 'sha1'), mb.get('hash_algo', 'sha1')
+    if algo_a == algo_b:
+        return lambda ia, ib: ia.get('hash', '') != ib.get('hash', '')
+
+    def differs(ia, ib):
+        if ia.get('size') != ib.get('size'):
+            return True
+        ha, hb = ia.get('hash', ''), ib.get('hash', '')
+        if algo_b != 'blake3' or blake3:
+            return _rehashed(repo_key, ha, algo_b) != hb
+        return ha != _rehashed(repo_key, hb, algo_a)  # blake3 isn't installed here
+    return differs
+
+
+@lru_cache(maxsize=512)
+def _cached_unified_diff(repo_key, ha, hb, fromfile='', tofile=''):
+    """Rendered unified diff between two blobs, or None if either is not UTF-8 text."""
+    if ha == hb:
+        return ''
+    ta, a_is_text = _decoded_lines(repo_key, ha)
+    tb, b_is_text = _decoded_lines(repo_key, hb)
+    if not (a_is_text and b_is_text):
+        return None
+    return '\n'.join(difflib.unified_diff(ta, tb, fromfile=fromfile, tofile=tofile, lineterm=''))
 
 class Timeline(QtWidgets.QWidget):
     selectionChanged = QtCore.Signal(list)  # Emit the selected list
+    MAX_PIXMAP_WIDTH = 32767  # Widest pixmap Qt's raster engine will paint into
     
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -17,16 +111,57 @@ class Timeline(QtWidgets.QWidget):
         self.setMinimumHeight(90)
         self.spacing = 150  # Fixed spacing between snapshot points (pixels)
         self.margin = 20  # Margin on left/right
+        self._index = {}  # Snapshot name -> position in points
+        self._labels = []  # Pre-formatted timestamp label per point
+        self._bg_pixmap = None  # Unselected dots + labels, rebuilt when points or size change
 
     def set_points(self, pts):
-        print(f"Setting timeline points: {len(pts)} snapshots, first={pts[0][0] if pts else 'None'}")  # Debug
+        log.debug("Setting timeline points: %d snapshots, first=%s", len(pts), pts[0][0] if pts else None)
         self.points = pts
+        self._index = {name: i for i, (name, _) in enumerate(pts)}
+        self._labels = [m.get('iso', '').replace('Z', '')[:19].replace('T', ' ') for _, m in pts]
+        self._bg_pixmap = None
         # Dynamically set width based on total snapshots for scrolling
         total_width = self.margin * 2 + max(0, len(pts) - 1) * self.spacing
         self.setFixedWidth(max(600, total_width))  # Minimum 600px for small timelines
-        print(f"Timeline width set to {self.width()}px for {len(pts)} snapshots")  # Debug
+        log.debug("Timeline width set to %dpx for %d snapshots", self.width(), len(pts))
         self.update()  # Force repaint
 
+    def resizeEvent(self, event):
+        self._bg_pixmap = None  # Height changes move every dot
+        super().resizeEvent(event)
+
+    def changeEvent(self, event):
+        if event.type() in (QtCore.QEvent.PaletteChange, QtCore.QEvent.FontChange):
+            self._bg_pixmap = None  # Labels are baked into the pixmap
+        super().changeEvent(event)
+
+    def _visible_range(self, rect):
+        """Indices of the points whose dot or label intersects rect."""
+        reach = 60  # Labels extend 60px either side of their dot
+        i0 = max(0, (rect.left() - self.margin - reach) // self.spacing)
+        i1 = min(len(self.points), (rect.right() - self.margin + reach) // self.spacing + 1)
+        return range(i0, i1)
+
+    def _draw_points(self, p, y, indices):
+        p.setBrush(QtGui.QColor('#2b7bf6'))
+        for i in indices:
+            x = self.margin + i * self.spacing
+            p.drawEllipse(QtCore.QPoint(x, y), 7, 7)
+            p.drawText(x - 60, y + 25, 120, 18, QtCore.Qt.AlignCenter, self._labels[i])
+
+    def _build_background(self, y, dpr):
+        pm = QtGui.QPixmap(self.size() * dpr)
+        pm.setDevicePixelRatio(dpr)
+        pm.fill(QtCore.Qt.transparent)
+        p = QtGui.QPainter(pm)
+        # A pixmap painter doesn't inherit the widget's pen and font like paintEvent's does
+        p.setPen(self.palette().color(QtGui.QPalette.WindowText))
+        p.setFont(self.font())
+        self._draw_points(p, y, range(len(self.points)))
+        p.end()
+        return pm
+
     def paintEvent(self, event):
         p = QtGui.QPainter(self)
         r = self.rect()
@@ -35,23 +170,32 @@ class Timeline(QtWidgets.QWidget):
             p.drawText(r, QtCore.Qt.AlignCenter, "No snapshots")
             return
         y = r.height() // 2
-        for i, (name, manifest) in enumerate(self.points):
-            x = self.margin + i * self.spacing
-            # Skip drawing if outside visible area (for efficiency, though Qt clips)
-            if x < r.left() - self.spacing or x > r.right() + self.spacing:
-                continue
-            color = QtGui.QColor('#f39c12') if name in self.selected else QtGui.QColor('#2b7bf6')
-            p.setBrush(color)
-            p.drawEllipse(QtCore.QPoint(x, y), 7, 7)
-            iso = manifest.get('iso', '')
-            label = iso.replace('Z', '')[:19].replace('T', ' ')
-            p.drawText(x - 60, y + 25, 120, 18, QtCore.Qt.AlignCenter, label)
-        print(f"Painting timeline: {len(self.points)} total snapshots")  # Debug
+        dpr = self.devicePixelRatioF()
+        if self._bg_pixmap is not None and self._bg_pixmap.devicePixelRatio() != dpr:
+            self._bg_pixmap = None  # Moved to a screen with a different scale
+        if self._bg_pixmap is None and r.width() * dpr <= self.MAX_PIXMAP_WIDTH:
+            self._bg_pixmap = self._build_background(y, dpr)
+        if self._bg_pixmap is not None:
+            # The source rect is in the pixmap's device pixels
+            er = QtCore.QRectF(event.rect())
+            src = QtCore.QRectF(er.x() * dpr, er.y() * dpr, er.width() * dpr, er.height() * dpr)
+            p.drawPixmap(er, self._bg_pixmap, src)
+        else:
+            self._draw_points(p, y, self._visible_range(event.rect()))
+        # Only the (at most two) selected dots are painted per frame
+        p.setBrush(QtGui.QColor('#f39c12'))
+        for name in self.selected:
+            i = self._index.get(name)
+            if i is not None:
+                p.drawEllipse(QtCore.QPoint(self.margin + i * self.spacing, y), 7, 7)
 
     def mouseReleaseEvent(self, event):
         pos = event.position().toPoint()
         y = self.rect().height() // 2
-        for i, (name, _) in enumerate(self.points):
+        # Only the nearest point can be under the cursor
+        i = round((pos.x() - self.margin) / self.spacing)
+        if 0 <= i < len(self.points):
+            name = self.points[i][0]
             x = self.margin + i * self.spacing
             if QtCore.QRect(x - 8, y - 8, 16, 16).contains(pos):
                 if name in self.selected:
@@ -60,20 +204,30 @@ class Timeline(QtWidgets.QWidget):
                     self.selected.append(name)
                     if len(self.selected) > 2:
                         self.selected.pop(0)
-                print(f"Mouse click detected, selected snapshot(s): {self.selected}, total selected: {len(self.selected)}")  # Debug
+                log.debug("Mouse click detected, selected snapshot(s): %s", self.selected)
                 self.selectionChanged.emit(self.selected)  # Emit the current selected list
                 self.update()
-                return
 
 class MainWindow(QtWidgets.QMainWindow):
     refreshRequested = QtCore.Signal()
+    overviewReady = QtCore.Signal(str, str)  # Overview HTML (empty on failure), status text
 
     def __init__(self, repo: Repo):
         super().__init__()
         self.repo = repo
+        self._repo_key = str(repo.root)
+        _repos[self._repo_key] = repo
+        self._manifest_cache = {}  # name -> (mtime_ns, manifest)
+        self._icon_tag_cache = None
         self.setWindowTitle(f"pyvcs — {repo.root}")
         self.resize(1100, 800)
-        self.refreshRequested.connect(self.refresh_snapshots)
+        # Bursts of watcher events collapse into one refresh after 150ms of quiet
+        self._refresh_timer = QtCore.QTimer(self)
+        self._refresh_timer.setSingleShot(True)
+        self._refresh_timer.setInterval(150)
+        self._refresh_timer.timeout.connect(self.refresh_snapshots)
+        self.refreshRequested.connect(self._refresh_timer.start)
+        self.overviewReady.connect(self._on_overview_ready)
         self._setup_ui()
         self._start_watcher()
 
@@ -117,6 +271,10 @@ class MainWindow(QtWidgets.QMainWindow):
         self.model = QtGui.QStandardItemModel()
         self.model.setHorizontalHeaderLabels(['Name', 'hash', 'size'])
         self.tree = QtWidgets.QTreeView()
+        # Uniform rows let the view skip measuring each one; no expand/collapse animation
+        self.tree.setUniformRowHeights(True)
+        self.tree.setAnimated(False)
+        self.tree.header().setSectionResizeMode(QtWidgets.QHeaderView.Interactive)
         self.tree.setModel(self.model)
         self.tree.clicked.connect(self.on_tree_clicked)
         splitter.addWidget(self.tree)
@@ -136,56 +294,59 @@ class MainWindow(QtWidgets.QMainWindow):
     def _start_watcher(self):
         from .watcher import AutoWatcher
         def schedule_refresh():
-            print("Emitting refreshRequested signal from watcher")  # Debug
+            log.debug("Emitting refreshRequested signal from watcher")
             self.refreshRequested.emit()
         self.watcher = AutoWatcher(self.repo, schedule_refresh)
         self.watcher.start()
-        print("Watcher started, monitoring:", str(self.repo.root))  # Debug
+        log.debug("Watcher started, monitoring: %s", self.repo.root)
+
+    def _manifest(self, name):
+        """Load a manifest, reusing the parsed copy while the file's mtime is unchanged."""
+        mtime = os.stat(self.repo.manifests / name).st_mtime_ns
+        cached = self._manifest_cache.get(name)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        m = self.repo.load_manifest(name)
+        self._manifest_cache[name] = (mtime, m)
+        return m
 
     def refresh_snapshots(self):
-        import time
-        for _ in range(3):  # Retry up to 3 times
-            items = self.repo.list_snapshots()
-            print(f"Refreshing timeline: attempt {_+1}, {len(items)} snapshots loaded, first={items[0][0] if items else 'None'}")  # Debug
-            self.timeline.set_points(items)
-            self.timeline.update()
-            self.lbl_status.setText(f"{len(items)} snapshots")
-            if items:
-                # Auto-select latest snapshot if none selected (to show files in tree)
-                if not self.timeline.selected and self.timeline.points:
-                    last_name = self.timeline.points[-1][0]
-                    self.timeline.selected = [last_name]
-                    self.timeline.selectionChanged.emit(self.timeline.selected)  # Trigger tree population
-                    self.timeline.update()
-                    print(f"Auto-selected latest snapshot: {last_name}")  # Debug
-                # Auto-scroll to the end to show latest snapshots
-                QtCore.QTimer.singleShot(0, lambda: self.scroll_area.horizontalScrollBar().setValue(self.scroll_area.horizontalScrollBar().maximum()))
-                break
-            print("No snapshots loaded, retrying...")
-            time.sleep(0.2)
-        else:
-            print("Warning: No snapshots loaded after retries")
+        items = self.repo.list_snapshots()
+        log.debug("Refreshing timeline: %d snapshots loaded", len(items))
+        self.timeline.set_points(items)
+        self.timeline.update()
+        self.lbl_status.setText(f"{len(items)} snapshots")
         # Update button state based on snapshot_overview.csv existence
         self.btn_show_snapshot.setEnabled((self.repo.root / 'snapshot_overview.csv').exists())
+        if not items:
+            return  # The watcher requests another refresh once a manifest is written
+        # Auto-select latest snapshot if none selected (to show files in tree)
+        if not self.timeline.selected and self.timeline.points:
+            last_name = self.timeline.points[-1][0]
+            self.timeline.selected = [last_name]
+            self.timeline.selectionChanged.emit(self.timeline.selected)  # Trigger tree population
+            self.timeline.update()
+            log.debug("Auto-selected latest snapshot: %s", last_name)
+        # Auto-scroll to the end to show latest snapshots
+        QtCore.QTimer.singleShot(0, lambda: self.scroll_area.horizontalScrollBar().setValue(self.scroll_area.horizontalScrollBar().maximum()))
 
     def on_manual_snapshot(self):
         self.lbl_status.setText('Snapshotting...')
-        import threading
         def worker():
             try:
                 _, created = self.repo.snapshot(message='manual')
-                print(f"Manual snapshot: created={created}")  # Debug
+                log.debug("Manual snapshot: created=%s", created)
                 import time
                 time.sleep(0.2)
                 self.refreshRequested.emit()
                 QtCore.QTimer.singleShot(200, lambda: self.lbl_status.setText('Ready' if created else 'No changes'))
             except Exception as e:
-                print(f"Manual snapshot error: {e}")
+                log.error("Manual snapshot error: %s", e)
                 QtCore.QTimer.singleShot(200, lambda: self.lbl_status.setText(f'Error: {e}'))
         threading.Thread(target=worker, daemon=True).start()
 
     def on_timeline_selection_change(self, selected):
-        print(f"Timeline selection changed: {selected}")  # Debug
+        log.debug("Timeline selection changed: %s", selected)
         self.timeline.selected = selected if selected else self.timeline.selected  # Sync selected state
         sel = self.timeline.selected
         # Toggle Edit Message button visibility
@@ -193,28 +354,28 @@ class MainWindow(QtWidgets.QMainWindow):
         if len(sel) == 0:
             self.model.removeRows(0, self.model.rowCount()); self.summary.clear(); self.diff.clear(); return
         if len(sel) == 1:
-            m = self.repo.load_manifest(sel[0])
-            print(f"Loading manifest for {sel[0]}, files: {list(m.get('files', {}).keys())}")  # Debug manifest content
+            m = self._manifest(sel[0])
+            log.debug("Loading manifest for %s, %d files", sel[0], len(m.get('files', {})))
             self.populate_tree_single(m)
             self.summary.setPlainText(f"Snapshot: {sel[0]}\n{m.get('iso')}\n{m.get('message','')}")
             self.diff.clear()
             return
-        a, b = sel; ma, mb = self.repo.load_manifest(a), self.repo.load_manifest(b)
-        print(f"Comparing {a} (files: {list(ma.get('files', {}).keys())}) with {b} (files: {list(mb.get('files', {}).keys())})")  # Debug
-        self.populate_tree_union(ma, mb)
-        added, removed, common = set(mb['files']) - set(ma['files']), set(ma['files']) - set(mb['files']), set(ma['files']) & set(mb['files'])
-        modified = {p for p in common if ma['files'].get(p, {}).get('hash', '') != mb['files'].get(p, {}).get('hash', '')}
-        unchanged = len(common) - len(modified)
+        a, b = sel; ma, mb = self._manifest(a), self._manifest(b)
+        log.debug("Comparing %s (%d files) with %s (%d files)", a, len(ma.get('files', {})), b, len(mb.get('files', {})))
+        # Classified once: across hash algorithms each comparison may rehash a blob
+        added, removed, modified, unchanged = _classify(ma['files'], mb['files'], _differs_fn(self._repo_key, ma, mb))
+        modified = set(modified)
+        self.populate_tree_union(ma, mb, modified)
         self.summary.setPlainText(f"A: {a}\nB: {b}\nAdded: {len(added)}\nRemoved: {len(removed)}\nModified: {len(modified)}\nUnchanged: {unchanged}")
         # Show diff for two snapshots
         if len(sel) == 2:
-            self.show_diff_between_snapshots(a, b, ma, mb)
+            self.show_diff_between_snapshots(a, b, ma, mb, modified)
 
     def edit_snapshot_message(self):
         if len(self.timeline.selected) != 1:
             return  # Shouldn't happen due to button visibility
         current_name = self.timeline.selected[0]
-        current_manifest = self.repo.load_manifest(current_name)
+        current_manifest = self._manifest(current_name)
         current_message = current_manifest.get('message', '')
         
         dialog = QtWidgets.QDialog(self)
@@ -236,15 +397,14 @@ class MainWindow(QtWidgets.QMainWindow):
         if dialog.exec() == QtWidgets.QDialog.Accepted:
             new_message = text_edit.toPlainText().strip()
             if new_message != current_message:
-                manifest_path = self.repo.manifests / f"{current_name}"
-                with open(manifest_path, 'r') as f:
-                    data = json.load(f)
+                # Re-read rather than mutate the copy shared through _manifest_cache
+                data = self.repo.load_manifest(current_name)
                 data['message'] = new_message
-                with open(manifest_path, 'w') as f:
-                    json.dump(data, f, indent=2)
-                print(f"Updated message for {current_name} to: {new_message}")  # Debug
+                self.repo.save_manifest(current_name, data)
+                self._manifest_cache.pop(current_name, None)
+                log.debug("Updated message for %s to: %s", current_name, new_message)
                 # Update summary immediately without full refresh
-                updated_manifest = self.repo.load_manifest(current_name)
+                updated_manifest = self._manifest(current_name)
                 self.summary.setPlainText(f"Snapshot: {current_name}\n{updated_manifest.get('iso')}\n{updated_manifest.get('message','')}")
 
     def export_overview(self):
@@ -253,88 +413,109 @@ class MainWindow(QtWidgets.QMainWindow):
             QtWidgets.QMessageBox.warning(self, "Export Overview", "Need at least two snapshots to generate overview.")
             return
 
-        first_name, first_m = snapshots[0]
-        last_name, last_m = snapshots[-1]
-        
-        files_first, files_last = first_m['files'], last_m['files']
-        added = set(files_last) - set(files_first)
-        removed = set(files_first) - set(files_last)
-        common = set(files_first) & set(files_last)
-        modified = {p for p in common if files_first[p]['hash'] != files_last[p]['hash']}
-        
-        # Convert icons to base64 for HTML
-        def icon_to_base64(icon):
-            pixmap = icon.pixmap(16, 16)  # 16x16 pixels for small icons
-            byte_array = QtCore.QByteArray()
-            buffer = QtCore.QBuffer(byte_array)
-            buffer.open(QtCore.QIODevice.WriteOnly)
-            pixmap.save(buffer, "PNG")
-            return base64.b64encode(byte_array.data()).decode('ascii')
-
-        folder_icon_base64 = icon_to_base64(self.icon_folder)
-        file_icon_base64 = icon_to_base64(self.icon_file)
-
-        # Prepare CSV data with bold/dark blue markers
-        csv_data = [['Type', 'File', 'Details']]
-        csv_data.append(['**Added files**', '', ''])
-        for p in sorted(added):
-            info = files_last[p]
-            csv_data.append(['Added', p, f"Size: {info['size']}, Hash: {info['hash']}"])
-        csv_data.append(['**Overview from**', first_name, last_name])
-        csv_data.append(['**Removed files**', '', ''])
-        for p in sorted(removed):
-            info = files_first[p]
-            csv_data.append(['Removed', p, f"Size: {info['size']}, Hash: {info['hash']}"])
-        csv_data.append(['**Modified files**', '', ''])
-        for p in sorted(modified):
-            a_bytes = self.repo.read_blob(files_first[p]['hash'])
-            b_bytes = self.repo.read_blob(files_last[p]['hash'])
+        icon_tags = self._icon_tags()  # Pixmaps may only be touched on the GUI thread
+        self.lbl_status.setText('Exporting overview...')
+        self.btn_export_overview.setEnabled(False)
+        def worker():
             try:
-                ta, tb = a_bytes.decode('utf-8').splitlines(), b_bytes.decode('utf-8').splitlines()
-                diff_lines = difflib.unified_diff(ta, tb, lineterm='')
-                diff_text = '\n'.join(diff_lines)
-            except:
-                diff_text = 'Binary or undecodable file (no text diff)'
-            csv_data.append(['Modified', p, diff_text.replace('\n', '\\n')])  # Escape newlines for CSV
+                html = self._write_overview(snapshots[0], snapshots[-1], icon_tags)
+                self.overviewReady.emit(html, 'Overview exported to snapshot_overview.csv')
+            except Exception as e:
+                log.error("Export overview error: %s", e)
+                self.overviewReady.emit('', f'Error: {e}')
+        threading.Thread(target=worker, daemon=True).start()
+
+    def _on_overview_ready(self, html, status):
+        if html:
+            # Show in diff view with HTML rendering
+            self.diff.setHtml(html)
+        self.lbl_status.setText(status)
+        self.btn_export_overview.setEnabled(True)
+        # Update button state after export
+        self.btn_show_snapshot.setEnabled((self.repo.root / 'snapshot_overview.csv').exists())
+
+    def _write_overview(self, first, last, icon_tags):
+        """Write snapshot_overview.csv for first..last and return the overview HTML (runs off the GUI thread)."""
+        first_name, first_m = first
+        last_name, last_m = last
         
-        # Save to CSV
+        files_first, files_last = first_m['files'], last_m['files']
+        added, removed, modified, _ = _classify(files_first, files_last, _differs_fn(self._repo_key, first_m, last_m))
+
         csv_path = self.repo.root / 'snapshot_overview.csv'
+        # CSV rows and HTML are produced in one pass so each diff is only held once
+        parts = [f"<b><font color='#00008B'><span style='font-size: 14pt;'>Overview from</span></font></b> {first_name} to {last_name}<br><br>"]
         with open(csv_path, 'w', newline='', encoding='utf-8') as f:
             writer = csv.writer(f, quoting=csv.QUOTE_ALL)
-            writer.writerows(csv_data)
-        print(f"Exported overview to {csv_path}")  # Debug
-        
-        # Generate text overview for display with HTML, icons, and colors
-        overview_text = f"<b><font color='#00008B'><span style='font-size: 14pt;'>Overview from</span></font></b> {first_name} to {last_name}<br><br>"
-        overview_text += f"<b><font color='#00008B'><span style='font-size: 14pt;'>Added files</span></font></b> ({len(added)}):<br>"
-        for p in sorted(added):
-            is_dir = any(part in p for part in ['/', '\\']) or p.endswith(('.dir', '.folder'))  # Simple dir detection
-            icon = f"<img src='data:image/png;base64,{folder_icon_base64}' width='16' height='16'>" if is_dir else f"<img src='data:image/png;base64,{file_icon_base64}' width='16' height='16'>"
-            overview_text += f"<font color='#006400'>{icon} {p}</font><br>"
-        overview_text += "<br>"
-        overview_text += f"<b><font color='#00008B'><span style='font-size: 14pt;'>Removed files</span></font></b> ({len(removed)}):<br>"
-        for p in sorted(removed):
-            is_dir = any(part in p for part in ['/', '\\']) or p.endswith(('.dir', '.folder'))  # Simple dir detection
-            icon = f"<img src='data:image/png;base64,{folder_icon_base64}' width='16' height='16'>" if is_dir else f"<img src='data:image/png;base64,{file_icon_base64}' width='16' height='16'>"
-            overview_text += f"<font color='#FF0000'>{icon} {p}</font><br>"
-        overview_text += "<br>"
-        overview_text += f"<b><font color='#00008B'><span style='font-size: 14pt;'>Modified files</span></font></b> ({len(modified)}):<br>"
-        for p in sorted(modified):
-            overview_text += f"{p}:<br>"
-            a_bytes = self.repo.read_blob(files_first[p]['hash'])
-            b_bytes = self.repo.read_blob(files_last[p]['hash'])
+            # CSV section headers carry bold/dark blue markers
+            writer.writerow(['Type', 'File', 'Details'])
+            writer.writerow(['**Added files**', '', ''])
+            parts.append(f"<b><font color='#00008B'><span style='font-size: 14pt;'>Added files</span></font></b> ({len(added)}):<br>")
+            for p in sorted(added):
+                info = files_last[p]
+                writer.writerow(['Added', p, f"Size: {info['size']}, Hash: {info['hash']}"])
+                is_dir = any(part in p for part in ['/', '\\']) or p.endswith(('.dir', '.folder'))  # Simple dir detection
+                parts.append(f"<font color='#006400'>{icon_tags[is_dir]} {p}</font><br>")
+            parts.append("<br>")
+            writer.writerow(['**Overview from**', first_name, last_name])
+            writer.writerow(['**Removed files**', '', ''])
+            parts.append(f"<b><font color='#00008B'><span style='font-size: 14pt;'>Removed files</span></font></b> ({len(removed)}):<br>")
+            for p in sorted(removed):
+                info = files_first[p]
+                writer.writerow(['Removed', p, f"Size: {info['size']}, Hash: {info['hash']}"])
+                is_dir = any(part in p for part in ['/', '\\']) or p.endswith(('.dir', '.folder'))  # Simple dir detection
+                parts.append(f"<font color='#FF0000'>{icon_tags[is_dir]} {p}</font><br>")
+            parts.append("<br>")
+            writer.writerow(['**Modified files**', '', ''])
+            parts.append(f"<b><font color='#00008B'><span style='font-size: 14pt;'>Modified files</span></font></b> ({len(modified)}):<br>")
+            # Diffs from the previous export are reused when a path's hash pair is unchanged
+            cache_path = self.repo.vcs_path / 'overview_cache.json'
             try:
-                ta, tb = a_bytes.decode('utf-8').splitlines(), b_bytes.decode('utf-8').splitlines()
-                diff_lines = difflib.unified_diff(ta, tb, lineterm='')
-                overview_text += '<pre>' + '\n'.join(diff_lines) + '</pre><br>'
-            except:
-                overview_text += 'Binary or undecodable file (no text diff)<br><br>'
-        
-        # Show in diff view with HTML rendering
-        self.diff.setHtml(overview_text)
-        self.lbl_status.setText(f"Overview exported to {csv_path.name}")
-        # Update button state after export
-        self.btn_show_snapshot.setEnabled(True)
+                cache = json.loads(cache_path.read_bytes())
+            except (OSError, ValueError):
+                cache = {}
+            new_cache = {}
+            def cache_key(p):
+                return f"{files_first[p]['hash']}:{files_last[p]['hash']}"
+            # Blob reads and C diffing overlap across files; results come back in path order
+            def diff_one(p):
+                hit = cache.get(p)
+                if hit and hit[0] == cache_key(p):
+                    return hit[1]
+                return _cached_unified_diff(self._repo_key, files_first[p]['hash'], files_last[p]['hash'])
+            modified_sorted = sorted(modified)
+            with ThreadPoolExecutor(max_workers=min(8, os.cpu_count() or 1)) as ex:
+                for p, diff_text in zip(modified_sorted, ex.map(diff_one, modified_sorted)):
+                    new_cache[p] = [cache_key(p), diff_text]
+                    parts.append(f"{p}:<br>")
+                    if diff_text is None:
+                        writer.writerow(['Modified', p, 'Binary or undecodable file (no text diff)'])
+                        parts.append('Binary or undecodable file (no text diff)<br><br>')
+                        continue
+                    writer.writerow(['Modified', p, diff_text.replace('\n', '\\n')])  # Escape newlines for CSV
+                    parts.append('<pre>' + escape(diff_text, quote=False) + '</pre><br>')
+        try:
+            cache_path.write_text(json.dumps(new_cache))
+        except OSError as e:
+            log.warning("Could not save overview cache: %s", e)
+        log.debug("Exported overview to %s", csv_path)
+        return ''.join(parts)
+
+    def _icon_tags(self):
+        """<img> tags for the folder/file icons keyed by is_dir, encoded once per window."""
+        if self._icon_tag_cache is None:
+            def icon_to_base64(icon):
+                pixmap = icon.pixmap(16, 16)  # 16x16 pixels for small icons
+                byte_array = QtCore.QByteArray()
+                buffer = QtCore.QBuffer(byte_array)
+                buffer.open(QtCore.QIODevice.WriteOnly)
+                pixmap.save(buffer, "PNG")
+                return base64.b64encode(byte_array.data()).decode('ascii')
+            self._icon_tag_cache = {
+                True: f"<img src='data:image/png;base64,{icon_to_base64(self.icon_folder)}' width='16' height='16'>",
+                False: f"<img src='data:image/png;base64,{icon_to_base64(self.icon_file)}' width='16' height='16'>",
+            }
+        return self._icon_tag_cache
 
     def show_snapshot(self):
         csv_path = self.repo.root / 'snapshot_overview.csv'
@@ -358,29 +539,49 @@ class MainWindow(QtWidgets.QMainWindow):
         self.diff.setHtml(html_content)
         self.lbl_status.setText(f"Showing snapshot from {csv_path.name}")
 
+    def _attach_tree(self, root):
+        # Rows appended to a detached item emit no model signals, so the whole
+        # tree is built under one and moved over a top-level row at a time.
+        while root.rowCount():
+            self.model.appendRow(root.takeRow(0))
+
+    def _expand_tree(self, node_count):
+        # Expanding every folder of a huge tree is slow; show the top two levels instead
+        if node_count > 1000:
+            self.tree.expandToDepth(1)
+        else:
+            self.tree.expandAll()
+
     def populate_tree_single(self, manifest):
-        self.model.removeRows(0, self.model.rowCount()); root = self.model.invisibleRootItem()
+        self.tree.setUpdatesEnabled(False); sorting = self.tree.isSortingEnabled(); self.tree.setSortingEnabled(False)
+        self.model.removeRows(0, self.model.rowCount()); root = QtGui.QStandardItem()  # Built off-model, see _attach_tree
+        child_index = {id(root): {}}  # id(parent item) -> {name: child item}
         for path, info in sorted(manifest['files'].items()):
             parts, parent = Path(path).parts, root
             for i, part in enumerate(parts):
-                found = next((parent.child(r,0) for r in range(parent.rowCount()) if parent.child(r,0).text()==part), None)
+                children = child_index.setdefault(id(parent), {}); found = children.get(part)
                 if not found:
                     icon = self.icon_folder if i < len(parts)-1 else self.icon_file
                     items = [QtGui.QStandardItem(icon, part), QtGui.QStandardItem(info.get('hash','')), QtGui.QStandardItem(str(info.get('size','')))]
-                    parent.appendRow(items); parent = items[0]
+                    parent.appendRow(items); children[part] = items[0]; child_index[id(items[0])] = {}; parent = items[0]
                 else: parent = found
-        self.tree.expandAll()
+        self._attach_tree(root)
+        self._expand_tree(len(child_index) - 1)
+        self.tree.setSortingEnabled(sorting); self.tree.setUpdatesEnabled(True)
 
-    def populate_tree_union(self, ma, mb):
-        self.model.removeRows(0, self.model.rowCount()); root = self.model.invisibleRootItem()
+    def populate_tree_union(self, ma, mb, modified):
+        self.tree.setUpdatesEnabled(False); sorting = self.tree.isSortingEnabled(); self.tree.setSortingEnabled(False)
+        self.model.removeRows(0, self.model.rowCount()); root = QtGui.QStandardItem()  # Built off-model, see _attach_tree
+        child_index = {id(root): {}}  # id(parent item) -> {name: child item}
         files_a, files_b = ma.get('files', {}), mb.get('files', {})
-        print(f"Union files_a: {list(files_a.keys())}, files_b: {list(files_b.keys())}")  # Debug
+        log.debug("Union of %d and %d files", len(files_a), len(files_b))
         for p in sorted(set(files_a.keys()) | set(files_b.keys())):
             parts, parent = Path(p).parts, root
             for i, part in enumerate(parts):
-                found = next((parent.child(r,0) for r in range(parent.rowCount()) if parent.child(r,0).text()==part), None)
+                children = child_index.setdefault(id(parent), {}); found = children.get(part)
                 if not found and i < len(parts)-1:
-                    node = QtGui.QStandardItem(self.icon_folder, part); parent.appendRow([node, QtGui.QStandardItem(''), QtGui.QStandardItem('')]); parent = node
+                    node = QtGui.QStandardItem(self.icon_folder, part); parent.appendRow([node, QtGui.QStandardItem(''), QtGui.QStandardItem('')])
+                    children[part] = node; child_index[id(node)] = {}; parent = node
                 elif not found:
                     node = QtGui.QStandardItem(self.icon_file, part)
                     hash_item, size_item = QtGui.QStandardItem(''), QtGui.QStandardItem('')
@@ -392,7 +593,7 @@ class MainWindow(QtWidgets.QMainWindow):
                     elif not in_a and in_b:
                         node.setBackground(QtGui.QColor('#ddffdd'))  # Green for added
                         hash_item.setBackground(QtGui.QColor('#ddffdd'))
-                    elif in_a and in_b and files_a[p].get('hash', '') != files_b[p].get('hash', ''):
+                    elif p in modified:
                         node.setBackground(QtGui.QColor('#add8e6'))  # Light blue for modified
                         hash_item.setBackground(QtGui.QColor('#add8e6'))
                     if in_b:
@@ -401,44 +602,38 @@ class MainWindow(QtWidgets.QMainWindow):
                     elif in_a:
                         hash_item.setText(files_a[p].get('hash', ''))
                         size_item.setText(str(files_a[p].get('size', '')))
-                    parent.appendRow([node, hash_item, size_item]); parent = node
+                    parent.appendRow([node, hash_item, size_item])
+                    children[part] = node; child_index[id(node)] = {}; parent = node
                 else: parent = found
-        self.tree.expandAll()
+        self._attach_tree(root)
+        self._expand_tree(len(child_index) - 1)
+        self.tree.setSortingEnabled(sorting); self.tree.setUpdatesEnabled(True)
 
-    def show_diff_between_snapshots(self, a, b, ma, mb):
+    def show_diff_between_snapshots(self, a, b, ma, mb, modified):
         files_a, files_b = ma.get('files', {}), mb.get('files', {})
-        common_files = set(files_a.keys()) & set(files_b.keys())
         diff_text = ""
-        for p in sorted(common_files):
-            if files_a[p].get('hash', '') != files_b[p].get('hash', ''):
-                a_bytes = self.repo.read_blob(files_a[p]['hash'])
-                b_bytes = self.repo.read_blob(files_b[p]['hash'])
-                try:
-                    ta, tb = a_bytes.decode('utf-8').splitlines(), b_bytes.decode('utf-8').splitlines()
-                    diff_lines = difflib.unified_diff(ta, tb, fromfile=a, tofile=b, lineterm='')
-                    diff_text += f"<b>{p}</b>:<br><pre>"
-                    diff_text += '\n'.join(diff_lines)
-                    diff_text += "</pre><br>"
-                except Exception:
-                    diff_text += f"<b>{p}</b>: Binary or undecodable file (no text diff)<br>"
+        for p in sorted(modified):
+            file_diff = _cached_unified_diff(self._repo_key, files_a[p]['hash'], files_b[p]['hash'], a, b)
+            if file_diff is not None:
+                diff_text += f"<b>{p}</b>:<br><pre>"
+                diff_text += file_diff
+                diff_text += "</pre><br>"
+            else:
+                diff_text += f"<b>{p}</b>: Binary or undecodable file (no text diff)<br>"
         self.diff.setHtml(diff_text if diff_text else "No differences in common files.")
 
     def on_tree_clicked(self, index):
         if len(self.timeline.selected) != 2: return
-        a, b = self.timeline.selected; ma, mb = self.repo.load_manifest(a), self.repo.load_manifest(b)
+        a, b = self.timeline.selected; ma, mb = self._manifest(a), self._manifest(b)
         item, parts = self.model.itemFromIndex(index), []
         while item and item != self.model.invisibleRootItem(): parts.append(item.text()); item = item.parent()
         rel = '/'.join(reversed(parts))
-        a_bytes, b_bytes = (self.repo.read_blob(ma['files'][rel]['hash']) if rel in ma['files'] else b''), (self.repo.read_blob(mb['files'][rel]['hash']) if rel in mb['files'] else b'')
-        try:
-            ta, tb = a_bytes.decode('utf-8'), b_bytes.decode('utf-8')
-            diff_lines = difflib.unified_diff(ta.splitlines(), tb.splitlines(), fromfile=a, tofile=b, lineterm='')
-            html = ['<pre>']
-            for ln in diff_lines:
-                esc = ln.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
-                if ln.startswith('+') and not ln.startswith('+++'): html.append(f'<div style="background:#ddffdd">{esc}</div>')
-                elif ln.startswith('-') and not ln.startswith('---'): html.append(f'<div style="background:#ffdddd">{esc}</div>')
-                elif ln.startswith('@@'): html.append(f'<div style="color:#666">{esc}</div>')
-                else: html.append(f'<div>{esc}</div>')
-            html.append('</pre>'); self.diff.setHtml('\n'.join(html))
-        except Exception: self.diff.setPlainText('Binary or undecodable file (no text diff)')
\ No newline at end of file
+        ha, hb = ma['files'].get(rel, {}).get('hash', ''), mb['files'].get(rel, {}).get('hash', '')
+        diff_text = _cached_unified_diff(self._repo_key, ha, hb, a, b)
+        if diff_text is None:
+            self.diff.setPlainText('Binary or undecodable file (no text diff)'); return
+        html = ['<pre>']
+        for ln in (diff_text.split('\n') if diff_text else []):
+            style = '' if ln.startswith(('+++', '---')) else _DIFF_LINE_STYLES.get(ln[:1], '')
+            html.append(f'<div{style}>{escape(ln, quote=False)}</div>')
+        html.append('</pre>'); self.diff.setHtml('\n'.join(html))
\ No newline at end of file
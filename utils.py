@@ -1,19 +1,43 @@
 import hashlib
 
-CHUNK_SIZE = 1024 * 64
-
-
-def sha1_file(path):
-    """SHA1 hash of a file (streaming)."""
-    h = hashlib.sha1()
-    with open(path, "rb") as f:
-        while True:
-            data = f.read(CHUNK_SIZE)
-            if not data:
-                break
-            h.update(data)
-    return h.hexdigest()
+try:
+    from blake3 import blake3
+except ImportError:  # optional; content hashes fall back to SHA256
+    blake3 = None
+
+CHUNK_SIZE = 1 << 20
+
+# Algorithm for new content hashes; each manifest records the one it used.
+# OpenSSL's SHA256 picks SHA-NI / ARMv8 crypto instructions at runtime.
+HASH_ALGO = "blake3" if blake3 else "sha256"
 
 
 def sha1_bytes(b: bytes) -> str:
     return hashlib.sha1(b).hexdigest()
+
+
+def sha256_bytes(b: bytes) -> str:
+    return hashlib.sha256(b).hexdigest()
+
+
+def content_hash(b: bytes, algo: str = HASH_ALGO) -> str:
+    """Content hash of bytes using the given manifest hash algorithm."""
+    if algo == "blake3":
+        return blake3(b).hexdigest(length=20)
+    if algo == "sha256":
+        return sha256_bytes(b)
+    return sha1_bytes(b)
+
+
+def new_content_hasher(algo: str = HASH_ALGO):
+    """Incremental hasher for algo; finish it with hasher_hexdigest."""
+    if algo == "blake3":
+        return blake3()
+    return hashlib.new(algo)
+
+
+def hasher_hexdigest(h, algo: str = HASH_ALGO) -> str:
+    """Hex digest of a new_content_hasher, matching content_hash's output."""
+    if algo == "blake3":
+        return h.hexdigest(length=20)
+    return h.hexdigest()
@@ -1,14 +1,93 @@
 import os
+import hashlib
 import json
+import logging
+import shutil
+import tempfile
+import threading
 import time
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
 from pathlib import Path
-from .utils import sha1_file, sha1_bytes
+try:
+    import orjson
+except ImportError:  # optional; the stdlib json module is the fallback
+    orjson = None
+try:
+    import msgpack
+except ImportError:  # optional; manifests are written as JSON without it
+    msgpack = None
+
+from .utils import CHUNK_SIZE, HASH_ALGO, hasher_hexdigest, new_content_hasher
+
+log = logging.getLogger('pyvcs.vcs')
 
 VCS_DIR = ".pyvcs"
 BLOBS_DIR = "blobs"
 MANIFESTS_DIR = "manifests"
 HEAD_FILE = "HEAD"
+INDEX_FILE = "index.json"
+# New manifests use the compact binary format when msgpack is installed
+MANIFEST_EXT = ".mpk" if msgpack else ".json"
+MANIFEST_EXTS = (".mpk", ".json")
+# Files modified this close to a scan may change again within the same
+# timestamp tick, so their stat data is not trusted for the next scan.
+RACY_WINDOW_NS = 2 * 10**9
+# update_files() falls back to a full scan this often, picking up anything
+# the watcher missed
+LIVE_RESCAN_SECONDS = 300
+
+
+def _dumps(obj, indent=False) -> bytes:
+    if orjson:
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0)
+        except TypeError:  # orjson rejects surrogate-escaped (undecodable) file names
+            pass
+    return json.dumps(obj, indent=2 if indent else None).encode()
+
+
+def _loads(data: bytes):
+    if orjson:
+        try:
+            return orjson.loads(data)
+        except ValueError:  # ...and lone surrogates that json escaped on the way out
+            pass
+    return json.loads(data)
+
+
+def _require_msgpack(name: str):
+    if msgpack is None:
+        raise RuntimeError(f"Manifest {name} is in msgpack format; install msgpack to use it")
+
+
+def _encode_manifest(name: str, manifest: dict) -> bytes:
+    if name.endswith(".mpk"):
+        _require_msgpack(name)
+        return msgpack.packb(manifest, unicode_errors="surrogateescape")
+    return _dumps(manifest, indent=True)
+
+
+def _decode_manifest(name: str, data: bytes):
+    if name.endswith(".mpk"):
+        _require_msgpack(name)
+        return msgpack.unpackb(data, raw=False, unicode_errors="surrogateescape")
+    return _loads(data)
+
+
+def _atomic_write(path: Path, data: bytes):
+    """Replace path with data so readers never see a partially written file."""
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=path.name, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
 
 class Repo:
     def __init__(self, root: Path):
@@ -17,6 +96,18 @@ class Repo:
         self.blobs = self.vcs_path / BLOBS_DIR
         self.manifests = self.vcs_path / MANIFESTS_DIR
         self.head = self.vcs_path / HEAD_FILE
+        self.index_path = self.vcs_path / INDEX_FILE
+        # Anchored at the repo's own VCS_DIR, so "foo.pyvcs.txt" or a nested
+        # ".pyvcs" somewhere in the tree are not mistaken for it
+        self._ignore_prefix = str(self.vcs_path) + os.sep
+        # list_snapshots result, reused while HEAD and the manifests dir are untouched
+        self._snap_cache = None
+        self._snap_cache_key = None
+        # {rel: {"hash", "size"}} as of the last full scan plus later update_files() calls
+        self._live_files = None
+        self._live_scanned_at = 0.0
+        # Per-thread read buffer for _hash_and_stage, reused across files
+        self._io_local = threading.local()
 
     def exists(self):
         return self.vcs_path.exists()
@@ -30,79 +121,348 @@ class Repo:
         self.head.write_text("")
         self.snapshot(message="Initial snapshot")
 
-    def _is_ignored(self, p: Path) -> bool:
-        return VCS_DIR in p.parts
+    def _load_index(self):
+        """Cached {rel: [mtime_ns, size, ino, hash]} from the last scan, if still valid."""
+        try:
+            data = _loads(self.index_path.read_bytes())
+        except (OSError, ValueError):
+            return {}
+        # Hashes from another algorithm would not match the new manifests
+        return data.get("files", {}) if data.get("algo") == HASH_ALGO else {}
+
+    def _save_index(self, entries):
+        try:
+            _atomic_write(self.index_path, _dumps({"algo": HASH_ALGO, "files": entries}))
+        except OSError:
+            pass
+
+    def _io_buffer(self):
+        buf = getattr(self._io_local, "buf", None)
+        if buf is None:
+            buf = self._io_local.buf = memoryview(bytearray(CHUNK_SIZE))
+        return buf
+
+    def _hash_and_stage(self, p):
+        """Hash p while copying it into a temp file under blobs/, reading it only once.
+
+        Returns (hash, size, tmp path); the caller moves tmp into place or drops it.
+        """
+        h = new_content_hasher()
+        size = 0
+        # Open the source first: if it is gone there is no temp file to clean up
+        with open(p, "rb") as src:
+            fd, tmp = tempfile.mkstemp(dir=self.blobs, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as out:
+                    # No mmap here: a working-tree file truncated mid-read would SIGBUS the process
+                    buf = self._io_buffer()
+                    while True:
+                        n = src.readinto(buf)
+                        if not n:
+                            break
+                        h.update(buf[:n])
+                        out.write(buf[:n])
+                        size += n
+            except BaseException:
+                os.unlink(tmp)
+                raise
+        return hasher_hexdigest(h), size, tmp
+
+    def _hash_one(self, path):
+        """(hash, size, staged tmp) of a working-tree file, or None if unreadable."""
+        try:
+            return self._hash_and_stage(path)
+        except Exception:
+            return None
+
+    def _has_blob(self, h):
+        try:
+            os.stat(self.blobs / h)
+            return True
+        except OSError:
+            return False
+
+    def _store_staged(self, staged):
+        """Move staged temp files into blobs/ under their hash, dropping ones already stored.
+
+        Returns the set of hashes now present in blobs/.
+        """
+        stored = set()
+        for h, tmp in staged:
+            try:
+                if h not in stored:
+                    # Identical new files are staged once each; only the first needs a stat
+                    try:
+                        os.stat(self.blobs / h)
+                    except FileNotFoundError:
+                        os.replace(tmp, self.blobs / h)
+                        stored.add(h)
+                        continue
+                    stored.add(h)
+                os.unlink(tmp)
+            except OSError:
+                pass
+        return stored
+
+    def _walk(self, path):
+        """Yield DirEntry objects for all files under path, skipping the repo's VCS_DIR."""
+        try:
+            it = os.scandir(path)
+        except OSError:
+            return
+        vcs_path = str(self.vcs_path)
+        with it:
+            for e in it:
+                if e.name == VCS_DIR and e.path == vcs_path:
+                    continue
+                try:
+                    is_dir = e.is_dir()
+                except OSError:
+                    continue
+                if is_dir:
+                    # Like os.walk, don't descend into symlinked directories
+                    if not e.is_symlink():
+                        yield from self._walk(e.path)
+                else:
+                    yield e
 
     def _collect_files(self):
-        files = {}
-        for root, dirs, filenames in os.walk(self.root):
-            rp = Path(root)
-            if self._is_ignored(rp):
-                dirs[:] = []
+        """Scan the working tree.
+
+        Returns (files, index entries for _save_index, [(hash, tmp)] for _store_staged).
+        """
+        index = self._load_index()
+        racy_after = time.time_ns() - RACY_WINDOW_NS
+        prefix_len = len(os.path.join(str(self.root), ""))
+        # Index hits are resolved inline; only misses go to the pool, so an
+        # unchanged tree costs one stat per file and no per-file futures
+        files, new_index, staged, misses = {}, {}, [], []
+        by_stat = None
+        for e in self._walk(str(self.root)):
+            rel = e.path[prefix_len:].replace("\\", "/")
+            try:
+                # Stat before hashing: a write during hashing bumps mtime past the key.
+                # DirEntry caches the result (and gets it for free from the listing on Windows).
+                st = e.stat()
+            except OSError:
+                continue
+            key = [st.st_mtime_ns, st.st_size, st.st_ino]
+            cached = index.get(rel)
+            if cached and cached[:3] == key:
+                files[rel] = {"hash": cached[3], "size": st.st_size}
+                new_index[rel] = cached
                 continue
-            for fname in filenames:
-                p = rp / fname
-                if self._is_ignored(p):
+            if st.st_ino:
+                # A renamed or moved file keeps its inode and mtime: look it up by
+                # stat data alone, trusting the hash only if its blob is stored
+                if by_stat is None:
+                    by_stat = {tuple(v[:3]): v[3] for v in index.values()}
+                h = by_stat.get(tuple(key))
+                if h is not None and self._has_blob(h):
+                    files[rel] = {"hash": h, "size": st.st_size}
+                    new_index[rel] = key + [h]
                     continue
-                rel = str(p.relative_to(self.root)).replace("\\", "/")
-                try:
-                    h = sha1_file(p)
-                    size = p.stat().st_size
+            files[rel] = None  # filled in below; keeps the dict in walk order
+            misses.append((rel, e.path, key))
+        if misses:
+            # hashlib releases the GIL while hashing, so files hash in parallel
+            with ThreadPoolExecutor(max_workers=os.cpu_count()) as ex:
+                results = ex.map(self._hash_one, [path for _, path, _ in misses])
+                for (rel, _, key), result in zip(misses, results):
+                    if result is None:
+                        del files[rel]
+                        continue
+                    h, size, tmp = result
                     files[rel] = {"hash": h, "size": size}
-                except Exception:
-                    continue
-        return files
+                    staged.append((h, tmp))
+                    if key[0] < racy_after:
+                        new_index[rel] = key + [h]
+        return files, new_index, staged
 
     def _fingerprint_for_files(self, files_map: dict) -> str:
-        files_only = {k: v["hash"] for k, v in sorted(files_map.items())}
-        return sha1_bytes(json.dumps(files_only, sort_keys=True).encode())
+        # Stream sorted "path\0hash\n" records straight into the hasher
+        h = hashlib.sha256()
+        for k in sorted(files_map):
+            h.update(k.encode("utf-8", "surrogateescape"))
+            h.update(b"\0")
+            h.update(files_map[k]["hash"].encode())
+            h.update(b"\n")
+        return h.hexdigest()
+
+    def _read_head(self) -> str:
+        try:
+            with open(self.head, "rb") as f:
+                return f.read().decode().strip()
+        except FileNotFoundError:
+            return ""
 
     def snapshot(self, message: str = ""):
-        files = self._collect_files()
+        files, index, staged = self._collect_files()
+        self._save_index(index)
+        # Blobs land before any manifest that references them
+        stored = self._store_staged(staged)
+        self._live_files, self._live_scanned_at = files, time.monotonic()
         fingerprint = self._fingerprint_for_files(files)
-        current_head = self.head.read_text().strip() if self.head.exists() else ""
-        if current_head == fingerprint:
+        if self._read_head() == fingerprint:
             return fingerprint, False
+        # Files whose hash came from the index were not staged; copy any missing
+        # blob, once per distinct hash
+        unique = {info["hash"]: rel for rel, info in files.items()}
+        for h, rel in unique.items():
+            if h in stored:
+                continue
+            blob_path = self.blobs / h
+            try:
+                os.stat(blob_path)
+            except FileNotFoundError:
+                try:
+                    # Kernel-side copy (sendfile/copy_file_range/fcopyfile), no Python buffer
+                    shutil.copyfile(self.root / rel, blob_path)
+                except Exception:
+                    pass
+        return self._write_snapshot(fingerprint, files, message)
+
+    def update_files(self, rels, message: str = ""):
+        """Snapshot after changes to just the given paths ('/'-separated, relative to root).
+
+        Only those files are rehashed; the rest come from the live file map. Falls
+        back to a full snapshot() if there is no map yet or it is due for a rescan.
+        """
+        if self._live_files is None or time.monotonic() - self._live_scanned_at >= LIVE_RESCAN_SECONDS:
+            return self.snapshot(message)
+        files = dict(self._live_files)
+        staged = []
+        rescan = False
+        for rel in rels:
+            p = os.path.join(self.root, rel)
+            try:
+                h, size, tmp = self._hash_and_stage(p)
+            except OSError:
+                if os.path.isdir(p):
+                    # Its contents were never reported file by file
+                    rescan = True
+                    continue
+                # Deleted or unreadable: a full scan would skip it too. A deleted
+                # directory may arrive as a plain path, so drop anything under it.
+                files.pop(rel, None)
+                prefix = rel + "/"
+                for k in [k for k in files if k.startswith(prefix)]:
+                    del files[k]
+                continue
+            files[rel] = {"hash": h, "size": size}
+            staged.append((h, tmp))
+        # Blobs of the untouched files were stored by earlier scans
+        self._store_staged(staged)
+        if rescan:
+            return self.snapshot(message)
+        self._live_files = files
+        fingerprint = self._fingerprint_for_files(files)
+        if self._read_head() == fingerprint:
+            return fingerprint, False
+        return self._write_snapshot(fingerprint, files, message)
+
+    def _write_snapshot(self, fingerprint, files, message):
+        # One clock read for all three timestamps, so they always agree
+        now = time.time_ns() / 1e9
+        dt = datetime.fromtimestamp(now, tz=timezone.utc)
         manifest = {
             "fingerprint": fingerprint,
-            "time": time.time(),
-            "iso": datetime.utcnow().isoformat() + "Z",
+            "time": now,
+            "iso": dt.isoformat().replace("+00:00", "Z"),
             "message": message,
+            "hash_algo": HASH_ALGO,
             "files": files,
         }
-        ts = datetime.utcnow().strftime("%Y%m%dT%H%M%S")
-        manifest_name = f"{fingerprint}-{ts}.json"
-        (self.manifests / manifest_name).write_text(json.dumps(manifest, indent=2))
-        for rel, info in files.items():
-            h = info.get("hash")
-            blob_path = self.blobs / h
-            if not blob_path.exists():
-                src = self.root / rel
-                try:
-                    blob_path.write_bytes(src.read_bytes())
-                except Exception:
-                    pass
-        self.head.write_text(fingerprint)
+        ts = dt.strftime("%Y%m%dT%H%M%S")
+        manifest_name = f"{fingerprint}-{ts}{MANIFEST_EXT}"
+        self.save_manifest(manifest_name, manifest)
+        _atomic_write(self.head, fingerprint.encode())
+        self._snap_cache = None
         return fingerprint, True
 
+    def _snapshots_key(self):
+        try:
+            return (os.stat(self.head).st_mtime_ns, os.stat(self.manifests).st_mtime_ns,
+                    len(os.listdir(self.manifests)))
+        except OSError:
+            return None
+
     def list_snapshots(self):
-        if not self.manifests.exists():
+        key = self._snapshots_key()
+        if key is not None and key == self._snap_cache_key and self._snap_cache is not None:
+            return list(self._snap_cache)
+        try:
+            with os.scandir(self.manifests) as it:
+                paths = [(e.name, e.path) for e in it if e.name.endswith(MANIFEST_EXTS) and e.is_file()]
+        except FileNotFoundError:
             return []
-        items = []
-        for p in self.manifests.iterdir():
-            if p.is_file() and p.suffix == '.json':
-                try:
-                    data = json.loads(p.read_text())
-                    items.append((p.name, data))
-                except Exception:
-                    continue
+
+        def read(entry):
+            name, path = entry
+            try:
+                with open(path, 'rb') as f:
+                    data = f.read()
+            except FileNotFoundError:
+                return None
+            # A manifest truncated by an older non-atomic write, or a stray file,
+            # must not hide the rest of the history
+            try:
+                manifest = _decode_manifest(name, data)
+            except ValueError as e:
+                log.warning("Skipping unreadable manifest %s: %s", name, e)
+                return None
+            if not isinstance(manifest, dict) or "time" not in manifest:
+                log.warning("Skipping manifest %s: not a snapshot manifest", name)
+                return None
+            return name, manifest
+
+        # File reads release the GIL, so they overlap across manifests
+        with ThreadPoolExecutor(max_workers=os.cpu_count()) as ex:
+            items = [item for item in ex.map(read, paths) if item is not None]
         items.sort(key=lambda x: x[1]['time'])
-        print(f"Listed {len(items)} snapshots")  # Debug
-        return items
+        self._snap_cache, self._snap_cache_key = items, key
+        return list(items)
 
     def load_manifest(self, name: str):
-        return json.loads((self.manifests / name).read_text())
+        with open(os.path.join(self.manifests, name), 'rb') as f:
+            return _decode_manifest(name, f.read())
+
+    def save_manifest(self, name: str, manifest: dict):
+        _atomic_write(self.manifests / name, _encode_manifest(name, manifest))
+        self._snap_cache = None
+
+    def migrate_manifests(self) -> int:
+        """Rewrite JSON manifests as msgpack; returns how many were converted.
+
+        Only run on request: afterwards the history can't be read without msgpack.
+        """
+        if msgpack is None:
+            raise RuntimeError("Migrating manifests requires msgpack")
+        try:
+            names = [n for n in os.listdir(self.manifests) if n.endswith(".json")]
+        except FileNotFoundError:
+            return 0
+        migrated = 0
+        for name in names:
+            new_name = name[:-len(".json")] + ".mpk"
+            # A converted copy may already exist if an earlier migration was interrupted
+            if not os.path.exists(os.path.join(self.manifests, new_name)):
+                try:
+                    manifest = self.load_manifest(name)
+                except ValueError as e:
+                    log.warning("Not migrating unreadable manifest %s: %s", name, e)
+                    continue
+                self.save_manifest(new_name, manifest)
+            os.unlink(os.path.join(self.manifests, name))
+            migrated += 1
+        if migrated:
+            self._snap_cache = None
+            log.info("Migrated %d manifests to msgpack", migrated)
+        return migrated
 
     def read_blob(self, hash_id: str) -> bytes:
-        p = self.blobs / hash_id
-        return p.read_bytes() if p.exists() else b""
+        try:
+            with open(os.path.join(self.blobs, hash_id), 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return b""
@@ -1,41 +1,89 @@
+import logging
+import os
 import threading
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 
+log = logging.getLogger('pyvcs.watcher')
+
 class DebouncedHandler(FileSystemEventHandler):
     def __init__(self, repo, callback, debounce_seconds=2.0):
         super().__init__()
         self.repo = repo
         self.callback = callback
         self.debounce_seconds = debounce_seconds
-        self._timer = None
+        # One long-lived worker; events only set a flag instead of spawning Timers
+        self._dirty = threading.Event()
+        # Paths changed since the last snapshot, or a full rescan when they can't be listed
         self._lock = threading.Lock()
+        self._pending = set()
+        self._full_rescan = False
+        self._stopped = False
+        self._worker = threading.Thread(target=self._run, daemon=True)
+        self._worker.start()
 
-    def _schedule(self):
+    def _schedule(self, paths=(), full=False):
         with self._lock:
-            if self._timer:
-                self._timer.cancel()
-            self._timer = threading.Timer(self.debounce_seconds, self._do_snapshot)
-            self._timer.daemon = True
-            self._timer.start()
+            self._pending.update(paths)
+            self._full_rescan |= full
+        self._dirty.set()
+
+    def _run(self):
+        while True:
+            self._dirty.wait()
+            self._dirty.clear()
+            # Wait for a quiet period, restarting it whenever another event arrives
+            while not self._stopped and self._dirty.wait(self.debounce_seconds):
+                self._dirty.clear()
+            if self._stopped:
+                return
+            self._do_snapshot()
+
+    def stop(self):
+        self._stopped = True
+        self._dirty.set()
 
     def _do_snapshot(self):
+        with self._lock:
+            paths, full = self._pending, self._full_rescan
+            self._pending, self._full_rescan = set(), False
         try:
-            fingerprint, created = self.repo.snapshot(message="Auto snapshot")
-            print(f"Watcher snapshot: fingerprint={fingerprint}, created={created}")  # Debug
+            if full:
+                fingerprint, created = self.repo.snapshot(message="Auto snapshot")
+            else:
+                root = str(self.repo.root)
+                rels = [os.path.relpath(p, root).replace(os.sep, "/") for p in paths]
+                fingerprint, created = self.repo.update_files(rels, message="Auto snapshot")
+            log.debug("Watcher snapshot: fingerprint=%s created=%s", fingerprint, created)
             if created:
                 import time
                 time.sleep(0.2)  # Increased delay for FS sync
-                print("Calling callback for UI refresh")  # Debug
+                log.debug("Calling callback for UI refresh")
                 self.callback()
         except Exception as e:
-            print("Watcher snapshot error:", e)
+            log.error("Watcher snapshot error: %s", e)
 
-    def on_any_event(self, event):
-        if ".pyvcs" in str(getattr(event, "src_path", "")):
+    def _on_change(self, event, *paths):
+        paths = [p for p in paths if not p.startswith(self.repo._ignore_prefix)]
+        # opened/closed events and directory mtime updates don't change any tracked content
+        if not paths or (event.is_directory and event.event_type == "modified"):
             return
-        print(f"Detected event: type={event.event_type}, path={event.src_path}, is_directory={event.is_directory}")  # Debug
-        self._schedule()
+        log.debug("Detected event: type=%s path=%s", event.event_type, event.src_path)
+        # Creating, moving or deleting a directory doesn't report the files inside it
+        self._schedule(paths, full=event.is_directory)
+
+    def on_created(self, event):
+        self._on_change(event, event.src_path)
+
+    def on_modified(self, event):
+        self._on_change(event, event.src_path)
+
+    def on_deleted(self, event):
+        self._on_change(event, event.src_path)
+
+    def on_moved(self, event):
+        # A move into or out of .pyvcs still changes the working tree
+        self._on_change(event, event.src_path, event.dest_path)
 
 class AutoWatcher:
     def __init__(self, repo, callback):
@@ -47,10 +95,11 @@ class AutoWatcher:
     def start(self):
         self.observer.schedule(self.handler, str(self.repo.root), recursive=True)
         self.observer.start()
-        print("Observer started, monitoring:", str(self.repo.root))  # Debug
+        log.debug("Observer started, monitoring: %s", self.repo.root)
 
     def stop(self):
         try:
+            self.handler.stop()
             self.observer.stop()
             self.observer.join()
         except Exception: